@@ -1,57 +1,185 @@
 #!/usr/bin/env python3
 """
 GPU Temperature Sensor Script
-Makes average H100 NVL GPU temperature available to lm-sensors
+Makes average H100 NVL GPU temperature (or the hottest GPU's temperature)
+available to lm-sensors
 Author: AI Assistant
 Usage: Run as daemon or via systemd service
 """
 
+import re
+import shutil
 import subprocess
+import tempfile
+import threading
 import time
 import argparse
 import sys
 import os
 import signal
+from collections import deque
+from itertools import islice
 from pathlib import Path
 import xml.etree.ElementTree as ET
 
+try:
+    import pynvml
+except ImportError:
+    pynvml = None
+
+try:
+    from lxml import etree
+except ImportError:
+    etree = None
+
+# lxml and ElementTree share the iterparse/findtext API used below
+_xml = etree if etree is not None else ET
+_XML_PARSE_ERRORS = (ET.ParseError, etree.XMLSyntaxError) if etree is not None else (ET.ParseError,)
+
+# nvidia-smi command lines and XML paths, built once at import time.
+# product_name and temperature/gpu_temp are direct children of <gpu>.
+# The PATH lookup for nvidia-smi is done here once rather than on every spawn;
+# if it isn't found, the bare name still produces FileNotFoundError at run time.
+_NVIDIA_SMI = shutil.which('nvidia-smi') or 'nvidia-smi'
+_ARGV_XML = (_NVIDIA_SMI, '-q', '-x')
+_ARGV_DISCOVER = (
+    _NVIDIA_SMI,
+    '--query-gpu=index,name,temperature.gpu',
+    '--format=csv,noheader,nounits'
+)
+_GPU_TAG = 'gpu'
+_NAME_PATH = 'product_name'
+_TEMP_PATH = 'temperature/gpu_temp'
+
+# Adaptive polling: readings within 1 °C for this many ticks double the interval
+_STABLE_TICKS = 3
+
+# One "index, name, temperature" row of nvidia-smi CSV output. The temperature
+# may be non-numeric (e.g. "[N/A]") and is only parsed when it is all digits.
+_CSV_ROW_RE = re.compile(rb'^(\d+),[ \t]*(.+?),[ \t]*([^,\n]*?)[ \t]*$', re.MULTILINE)
+
+
+def _iter_csv_temps(lines):
+    """Yield temperatures from bare nvidia-smi CSV lines, skipping cards that report "[N/A]" etc."""
+    for line in lines:
+        line = line.strip()
+        if line.isdigit():
+            yield int(line)
+
+
+def mean_millidegrees(temps):
+    """Average of temperatures in °C as integer millidegrees, or None if there are none"""
+    total = 0
+    count = 0
+    for temp in temps:
+        total += temp
+        count += 1
+    return total * 1000 // count if count else None
+
+
+def max_millidegrees(temps):
+    """Hottest of temperatures in °C as millidegrees, or None if there are none"""
+    hottest = max(temps, default=None)
+    return hottest * 1000 if hottest is not None else None
+
 
 class GPUTempSensor:
-    def __init__(self):
-        self.temp_file = Path("/tmp/gpu_h100_avg_temp")
-        self.running = True
-        self.target_product = "NVIDIA H100 NVL"
+    """Publishes one aggregated GPU temperature to a file for lm-sensors
+    
+    target_product selects the cards to read (None for all GPUs) and agg
+    reduces their temperatures in °C to a single millidegree value.
+    """
+    def __init__(self, target_product="NVIDIA H100 NVL", agg=mean_millidegrees,
+                 temp_file="/tmp/gpu_h100_avg_temp", label="H100 NVL average",
+                 use_xml=False, batch=1):
+        self.temp_file = Path(temp_file)
+        self._stop = threading.Event()
+        self.target_product = target_product
+        self.agg = agg
+        self.label = label
+        self.use_xml = use_xml
+        self._nvml_handles = None
+        self._gpu_indices = None
+        self._temp_argv = None
+        self._last_milli = None
+        # Batches go to their own file; temp_file stays a single value for lm-sensors/hwmon
+        self.batch_file = self.temp_file.with_name(self.temp_file.name + '.batch')
+        self._batch = deque(maxlen=batch) if batch > 1 else None
+        self._stream_proc = None
+        self._nvml_rescan = False
+        self._init_nvml()
         
-    def get_h100_nvl_avg_temp(self):
-        """Get the average GPU temperature from H100 NVL cards only"""
+    def _init_nvml(self):
+        """Initialize NVML once and cache handles of matching cards (topology is static)"""
+        if pynvml is None:
+            return
         try:
-            # Use XML output for more reliable parsing
-            result = subprocess.run([
-                'nvidia-smi', '-q', '-x'
-            ], capture_output=True, text=True, check=True)
-            
-            # Parse XML output
-            root = ET.fromstring(result.stdout)
-            h100_temperatures = []
+            pynvml.nvmlInit()
+            handles = []
+            for i in range(pynvml.nvmlDeviceGetCount()):
+                handle = pynvml.nvmlDeviceGetHandleByIndex(i)
+                name = pynvml.nvmlDeviceGetName(handle)
+                # Older pynvml releases return bytes
+                if isinstance(name, bytes):
+                    name = name.decode()
+                if self.target_product is None or name == self.target_product:
+                    handles.append(handle)
+            self._nvml_handles = handles
+        except pynvml.NVMLError as e:
+            print(f"Warning: NVML unavailable ({e}), falling back to nvidia-smi", file=sys.stderr)
+            self._nvml_handles = None
+    
+    def _shutdown_nvml(self):
+        """Release NVML if it was initialized"""
+        if self._nvml_handles is not None:
+            try:
+                pynvml.nvmlShutdown()
+            except pynvml.NVMLError:
+                pass
+            self._nvml_handles = None
+    
+    def get_temp_nvml(self):
+        """Get the aggregated temperature (millidegrees) directly from NVML (no subprocess)"""
+        if not self._nvml_handles:
+            return None
+        try:
+            return self.agg(
+                pynvml.nvmlDeviceGetTemperature(h, pynvml.NVML_TEMPERATURE_GPU)
+                for h in self._nvml_handles
+            )
+        except pynvml.NVMLError as e:
+            print(f"Error: NVML temperature query failed ({e})", file=sys.stderr)
+            return None
+    
+    def _iter_xml_temps(self, stream):
+        """Yield temperatures of matching cards from streamed nvidia-smi XML"""
+        for _, elem in _xml.iterparse(stream, events=('end',)):
+            if elem.tag != _GPU_TAG:
+                continue
+            # Check product name
+            if self.target_product is None or elem.findtext(_NAME_PATH) == self.target_product:
+                temp_str = elem.findtext(_TEMP_PATH)
+                if temp_str is not None:
+                    try:
+                        # "45 C": only split off the leading number
+                        yield int(temp_str.split(None, 1)[0])
+                    except (ValueError, IndexError):
+                        pass
+            # Release the finished <gpu> subtree
+            elem.clear()
+    
+    def get_temp_xml(self):
+        """Get the aggregated temperature (millidegrees) from the full XML dump (debug only)"""
+        try:
+            # Stream-parse the XML while nvidia-smi is still writing it, instead
+            # of building the whole document in memory first
+            with subprocess.Popen(_ARGV_XML, stdout=subprocess.PIPE) as proc:
+                millidegrees = self.agg(self._iter_xml_temps(proc.stdout))
             
-            # Find all GPU temperature readings for H100 NVL cards
-            for gpu in root.findall('.//gpu'):
-                # Check product name
-                product_elem = gpu.find('.//product_name')
-                if product_elem is not None and product_elem.text == self.target_product:
-                    temp_elem = gpu.find('.//temperature/gpu_temp')
-                    if temp_elem is not None:
-                        temp_str = temp_elem.text.replace(' C', '')
-                        try:
-                            h100_temperatures.append(int(temp_str))
-                        except ValueError:
-                            continue
+            if proc.returncode != 0:
+                raise subprocess.CalledProcessError(proc.returncode, proc.args)
             
-            if h100_temperatures:
-                # Return average temperature
-                return sum(h100_temperatures) / len(h100_temperatures)
-            else:
-                return None
+            return millidegrees
                 
         except subprocess.CalledProcessError:
             print("Error: nvidia-smi command failed", file=sys.stderr)
@@ -59,187 +187,375 @@ class GPUTempSensor:
         except FileNotFoundError:
             print("Error: nvidia-smi not found", file=sys.stderr)
             return None
-        except ET.ParseError:
+        except _XML_PARSE_ERRORS:
             print("Error: Failed to parse nvidia-smi XML output", file=sys.stderr)
             return None
     
-    def get_h100_nvl_avg_temp_csv(self):
-        """Alternative method using CSV output (fallback) - filters by index"""
+    def _discover_gpus(self):
+        """Find matching cards and read their temperatures in a single nvidia-smi call
+        
+        Returns the indices of the matching cards and their temperatures.
+        Cards are matched on name alone; one without a readable temperature
+        is still cached and just left out of this first sample.
+        """
+        output = subprocess.check_output(_ARGV_DISCOVER)
+        
+        target = self.target_product.encode() if self.target_product is not None else None
+        gpu_indices = []
+        temps = []
+        for m in _CSV_ROW_RE.finditer(output):
+            index, name, temp = m.groups()
+            if target is None or target in name:
+                gpu_indices.append(int(index))
+                if temp.isdigit():
+                    temps.append(int(temp))
+        return gpu_indices, temps
+    
+    def get_temp_csv(self):
+        """Get the aggregated temperature (millidegrees) using targeted CSV output - filters by cached index"""
         try:
-            # First get product names to identify H100 NVL cards
-            result = subprocess.run([
-                'nvidia-smi', 
-                '--query-gpu=index,name',
-                '--format=csv,noheader'
-            ], capture_output=True, text=True, check=True)
+            # GPU topology is static, so only look up matching indices once
+            # and build the temperature query argv for them at the same time.
+            # The lookup already returns temperatures, so it doubles as the
+            # first sample instead of costing a second nvidia-smi run.
+            if self._gpu_indices is None:
+                self._gpu_indices, temps = self._discover_gpus()
+                self._temp_argv = [
+                    _NVIDIA_SMI,
+                    '--query-gpu=temperature.gpu',
+                    '--format=csv,noheader,nounits',
+                    '-i', ','.join(map(str, self._gpu_indices))
+                ]
+                return self.agg(temps)
             
-            h100_indices = []
-            for line in result.stdout.strip().split('\n'):
-                if line.strip():
-                    parts = line.strip().split(', ')
-                    if len(parts) >= 2 and self.target_product in parts[1]:
-                        try:
-                            h100_indices.append(int(parts[0]))
-                        except ValueError:
-                            continue
-            
-            if not h100_indices:
+            if not self._gpu_indices:
                 return None
             
-            # Now get temperatures for all GPUs
-            result = subprocess.run([
-                'nvidia-smi', 
-                '--query-gpu=index,temperature.gpu',
-                '--format=csv,noheader,nounits'
-            ], capture_output=True, text=True, check=True)
+            # Only ask nvidia-smi for the temperatures of the matching cards.
+            # int() accepts bytes, so the output is never decoded to str.
+            output = subprocess.check_output(self._temp_argv)
             
-            h100_temperatures = []
-            for line in result.stdout.strip().split('\n'):
-                if line.strip():
-                    parts = line.strip().split(', ')
-                    if len(parts) >= 2:
-                        try:
-                            index = int(parts[0])
-                            temp = int(parts[1])
-                            if index in h100_indices:
-                                h100_temperatures.append(temp)
-                        except ValueError:
-                            continue
-            
-            return sum(h100_temperatures) / len(h100_temperatures) if h100_temperatures else None
+            # One bare integer per line, in -i order
+            return self.agg(_iter_csv_temps(output.splitlines()))
             
         except (subprocess.CalledProcessError, FileNotFoundError):
             return None
     
+    def get_temp(self):
+        """Get the aggregated temperature in millidegrees, preferring NVML over nvidia-smi"""
+        # Re-enumerate NVML devices if a rescan was requested via SIGHUP
+        if self._nvml_rescan:
+            self._nvml_rescan = False
+            self._shutdown_nvml()
+            self._init_nvml()
+        
+        millidegrees = self.get_temp_nvml()
+        
+        # Fallback to nvidia-smi if NVML is unavailable. The full XML dump is
+        # far more expensive than the targeted CSV query, so it is debug only.
+        if millidegrees is None and self.use_xml:
+            millidegrees = self.get_temp_xml()
+        if millidegrees is None:
+            millidegrees = self.get_temp_csv()
+        
+        return millidegrees
+    
     def write_temp_file(self):
-        """Write average H100 NVL temperature to file in lm-sensors format (millidegrees)"""
-        avg_temp = self.get_h100_nvl_avg_temp()
+        """Write the aggregated temperature to file in lm-sensors format (millidegrees)"""
+        return self._write_temp(self.get_temp())
+    
+    def _write_temp(self, millidegrees):
+        """Write an already measured millidegree value to the temperature file"""
+        if millidegrees is None:
+            print(f"Error: Could not get {self.label} GPU temperature (no matching cards found?)", file=sys.stderr)
+            return False
         
-        # Fallback to CSV method if XML fails
-        if avg_temp is None:
-            avg_temp = self.get_h100_nvl_avg_temp_csv()
+        batch_ok = True
+        if self._batch is not None:
+            # Batch mode: buffer samples and write them out together when full
+            self._batch.append((time.time(), millidegrees))
+            if len(self._batch) == self._batch.maxlen:
+                batch_ok = self._flush_batch()
         
-        if avg_temp is not None:
-            # Write temperature in millidegrees (lm-sensors format)
-            millidegrees = int(avg_temp * 1000)
-            try:
-                with open(self.temp_file, 'w') as f:
-                    f.write(f"{millidegrees}\n")
-                
-                # Make file readable by all
-                os.chmod(self.temp_file, 0o644)
-                print(f"H100 NVL average temperature: {avg_temp:.1f}°C written to {self.temp_file}")
-                return True
-            except IOError as e:
-                print(f"Error writing to {self.temp_file}: {e}", file=sys.stderr)
-                return False
-        else:
-            print("Error: Could not get H100 NVL GPU temperature (no H100 NVL cards found?)", file=sys.stderr)
+        # Nothing to rewrite if the value hasn't changed since the last tick
+        if millidegrees == self._last_milli:
+            return batch_ok
+        
+        if not self._replace_file(self.temp_file, f"{millidegrees}\n"):
+            return False
+        self._last_milli = millidegrees
+        print(f"{self.label} temperature: {millidegrees / 1000:.1f}°C written to {self.temp_file}")
+        return batch_ok
+    
+    def _flush_batch(self):
+        """Write all buffered "timestamp millidegrees" samples in a single write"""
+        if not self._batch:
+            return True
+        content = "".join(f"{ts:.3f} {milli}\n" for ts, milli in self._batch)
+        samples = len(self._batch)
+        self._batch.clear()
+        
+        if not self._replace_file(self.batch_file, content):
+            return False
+        print(f"{samples} {self.label} temperature samples written to {self.batch_file}")
+        return True
+    
+    def _clear_temp_file(self):
+        """Remove the temperature file so readers don't see a stale value as current"""
+        try:
+            self.temp_file.unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Error removing {self.temp_file}: {e}", file=sys.stderr)
+        # Make sure the next reading is written even if it equals the last one
+        self._last_milli = None
+    
+    def _replace_file(self, path, content):
+        """Atomically replace path with content"""
+        tmp_file = None
+        try:
+            # Write a temporary file and rename it over the target, so
+            # readers never see a partially written value. mkstemp picks an
+            # unpredictable name and creates it exclusively, which matters
+            # in a world-writable directory like /tmp.
+            fd, tmp_file = tempfile.mkstemp(dir=path.parent, prefix=path.name + '.')
+            with os.fdopen(fd, 'w') as f:
+                # Make file readable by all (mkstemp creates it 0600)
+                os.fchmod(fd, 0o644)
+                f.write(content)
+            os.replace(tmp_file, path)
+            return True
+        except IOError as e:
+            print(f"Error writing to {path}: {e}", file=sys.stderr)
+            if tmp_file is not None:
+                try:
+                    os.unlink(tmp_file)
+                except OSError:
+                    pass
             return False
     
     def signal_handler(self, signum, frame):
         """Handle shutdown signals gracefully"""
         print(f"\nReceived signal {signum}, shutting down...")
-        self.running = False
+        self._stop.set()
+        if self._stream_proc is not None and self._stream_proc.poll() is None:
+            self._stream_proc.terminate()
+        # NVML is shut down by run_daemon once the loop exits; doing it here
+        # could pull it out from under a reading that is in progress
     
-    def run_daemon(self, interval=5):
+    def reload_handler(self, signum, frame):
+        """Forget cached GPU topology so it is rediscovered on the next reading (SIGHUP)"""
+        print(f"\nReceived signal {signum}, rescanning GPUs...")
+        self._gpu_indices = None
+        self._temp_argv = None
+        self._nvml_rescan = self._nvml_handles is not None
+        # The streaming nvidia-smi was started for the old indices
+        if self._stream_proc is not None and self._stream_proc.poll() is None:
+            self._stream_proc.terminate()
+    
+    def run_daemon(self, interval=5, cpu=0, max_interval=None):
         """Run as daemon, updating temperature every interval seconds"""
+        # Keep the daemon (and the nvidia-smi children it spawns) on one
+        # housekeeping core at low priority, so that on shared GPU training
+        # nodes it doesn't migrate onto and pollute the training cores
+        try:
+            os.sched_setaffinity(0, {cpu})
+        except (OSError, ValueError) as e:
+            print(f"Warning: could not pin to CPU {cpu}: {e}", file=sys.stderr)
+        try:
+            os.nice(10)
+        except OSError as e:
+            print(f"Warning: could not lower priority: {e}", file=sys.stderr)
+        
         # Set up signal handlers
         signal.signal(signal.SIGTERM, self.signal_handler)
         signal.signal(signal.SIGINT, self.signal_handler)
+        signal.signal(signal.SIGHUP, self.reload_handler)
         
-        print(f"Starting H100 NVL GPU temperature monitoring daemon (interval: {interval}s)...")
-        print(f"Target product: {self.target_product}")
+        print(f"Starting {self.label} GPU temperature monitoring daemon (interval: {interval}s)...")
+        print(f"Target product: {self.target_product or 'all GPUs'}")
         print(f"Temperature file: {self.temp_file}")
-        print("Press Ctrl+C to stop")
+        print("Press Ctrl+C to stop, send SIGHUP to rescan GPUs")
+        
+        # NVML reads are cheap enough to poll; without NVML, keep a single
+        # nvidia-smi process streaming samples instead of spawning one per tick
+        if self._nvml_handles or self.use_xml:
+            self._run_polling(interval, max_interval)
+        else:
+            self._run_streaming(interval)
         
-        while self.running:
+        # Don't lose samples still waiting for a full batch
+        if self._batch:
+            self._flush_batch()
+        self._shutdown_nvml()
+        print("Daemon stopped")
+    
+    def _run_polling(self, interval, max_interval=None):
+        """Query the temperature every interval seconds
+        
+        With max_interval, polling backs off while the temperature is stable:
+        after _STABLE_TICKS readings within 1 °C of each other the interval
+        doubles (up to max_interval), and a jump of 2 °C or more resets it.
+        """
+        cur_interval = interval
+        stable_count = 0
+        while not self._stop.is_set():
+            prev_milli = self._last_milli
             if not self.write_temp_file():
                 print("Failed to update temperature, retrying...", file=sys.stderr)
+                cur_interval = interval
+                stable_count = 0
+            elif max_interval and prev_milli is not None:
+                delta = abs(self._last_milli - prev_milli)
+                if delta >= 2000:
+                    cur_interval = interval
+                    stable_count = 0
+                elif delta < 1000:
+                    stable_count += 1
+                    if stable_count >= _STABLE_TICKS:
+                        cur_interval = min(max_interval, cur_interval * 2)
+                        stable_count = 0
+                else:
+                    stable_count = 0
             
-            # Sleep with interruption check
-            for _ in range(interval):
-                if not self.running:
+            # Single sleep that the signal handler can cut short
+            self._stop.wait(cur_interval)
+    
+    def _run_streaming(self, interval):
+        """Read temperatures from one long-lived 'nvidia-smi -lms' process"""
+        while not self._stop.is_set():
+            # (Re)discover the cards. Failures (e.g. driver not up yet at boot)
+            # are retried here rather than giving up on streaming for the rest
+            # of the daemon's life. Discovery's own reading isn't recorded:
+            # 'nvidia-smi -lms' prints its first sample immediately, and
+            # recording both would duplicate it (e.g. in the --batch file).
+            if not self._gpu_indices:
+                self._gpu_indices = None
+                self.get_temp_csv()
+                if not self._gpu_indices:
+                    print("Could not discover matching GPUs, retrying...", file=sys.stderr)
+                    self._clear_temp_file()
+                    self._stop.wait(interval)
+                    continue
+                
+                argv = self._temp_argv[:1] + ['-lms', str(interval * 1000)] + self._temp_argv[1:]
+                gpu_count = len(self._gpu_indices)
+            
+            try:
+                self._stream_proc = subprocess.Popen(argv, stdout=subprocess.PIPE)
+            except OSError as e:
+                print(f"Error: could not start nvidia-smi ({e})", file=sys.stderr)
+                self._stop.wait(interval)
+                continue
+            
+            # A signal may have arrived before the process existed
+            if self._stop.is_set() or self._gpu_indices is None:
+                self._stream_proc.terminate()
+            
+            # nvidia-smi prints one line per GPU, in -i order, for every sample
+            lines = iter(self._stream_proc.stdout.readline, b'')
+            while True:
+                sample = tuple(islice(lines, gpu_count))
+                if len(sample) < gpu_count:
                     break
-                time.sleep(1)
-        
-        print("Daemon stopped")
+                self._write_temp(self.agg(_iter_csv_temps(sample)))
+            
+            self._stream_proc.stdout.close()
+            self._stream_proc.wait()
+            # No delay when stopped on purpose for a SIGHUP rescan
+            if not self._stop.is_set() and self._gpu_indices is not None:
+                # A card may have dropped off the bus or the driver restarted,
+                # so rediscover rather than respawning with stale -i indices,
+                # and don't leave the last reading looking live meanwhile
+                print("nvidia-smi exited unexpectedly, rediscovering GPUs...", file=sys.stderr)
+                self._gpu_indices = None
+                self._clear_temp_file()
+                self._stop.wait(interval)
     
     def test_temperature(self):
         """Test temperature reading and display result"""
-        print("Testing H100 NVL GPU temperature detection...")
-        print(f"Target product: {self.target_product}")
+        print(f"Testing {self.label} GPU temperature detection...")
+        print(f"Target product: {self.target_product or 'all GPUs'}")
         
         # Show all GPUs first
         try:
             result = subprocess.run([
-                'nvidia-smi', 
+                _NVIDIA_SMI, 
                 '--query-gpu=index,name,temperature.gpu',
                 '--format=csv,noheader'
             ], capture_output=True, text=True, check=True)
             
             print("\nAll detected GPUs:")
-            h100_count = 0
+            match_count = 0
             for line in result.stdout.strip().split('\n'):
                 if line.strip():
                     parts = line.strip().split(', ')
                     if len(parts) >= 2:
-                        is_h100 = self.target_product in parts[1]
-                        marker = " ← H100 NVL" if is_h100 else ""
-                        if is_h100:
-                            h100_count += 1
+                        is_match = self.target_product is None or self.target_product in parts[1]
+                        marker = " ←" if is_match else ""
+                        if is_match:
+                            match_count += 1
                         print(f"  {line}{marker}")
             
-            print(f"\nFound {h100_count} H100 NVL card(s)")
+            print(f"\nFound {match_count} matching card(s)")
                         
         except (subprocess.CalledProcessError, FileNotFoundError):
             print("Could not list GPUs")
         
         # Test temperature reading
-        temp = self.get_h100_nvl_avg_temp()
-        if temp is None:
-            temp = self.get_h100_nvl_avg_temp_csv()
+        millidegrees = self.get_temp()
         
-        if temp is not None:
-            print(f"Average H100 NVL temperature: {temp:.1f}°C")
+        if millidegrees is not None:
+            print(f"{self.label} temperature: {millidegrees / 1000:.1f}°C")
         else:
-            print("Error: Could not detect H100 NVL GPU temperature")
-            print("Make sure you have H100 NVL cards installed and nvidia-smi is working")
+            print(f"Error: Could not detect {self.label} GPU temperature")
+            print(f"Make sure you have {self.target_product or 'NVIDIA'} cards installed and nvidia-smi is working")
             return False
         
         return True
 
 
-def create_systemd_service(script_path, interval=5):
+def create_systemd_service(script_path, interval=5, cpu=0, max_interval=None, batch=1, all_gpus=False,
+                           description="H100 NVL GPU Temperature Sensor", service_name="gpu-h100-temp-sensor"):
     """Create systemd service file"""
+    exec_args = f"--daemon --interval {interval} --cpu {cpu}"
+    if max_interval:
+        exec_args += f" --max-interval {max_interval}"
+    if batch > 1:
+        exec_args += f" --batch {batch}"
+    if all_gpus:
+        exec_args += " --all-gpus"
+    
     service_content = f"""[Unit]
-Description=H100 NVL GPU Temperature Sensor
+Description={description}
 After=multi-user.target
 Wants=multi-user.target
 
 [Service]
 Type=simple
-ExecStart={script_path} --daemon --interval {interval}
+ExecStart={script_path} {exec_args}
 Restart=always
 RestartSec=10
 User=root
 KillSignal=SIGTERM
+ExecReload=/bin/kill -HUP $MAINPID
 TimeoutStopSec=30
 
 [Install]
 WantedBy=multi-user.target
 """
     
-    service_file = Path("/etc/systemd/system/gpu-h100-temp-sensor.service")
+    service_file = Path(f"/etc/systemd/system/{service_name}.service")
     
     try:
         with open(service_file, 'w') as f:
             f.write(service_content)
         
         print(f"Systemd service created at {service_file}")
-        print("Enable with: systemctl enable gpu-h100-temp-sensor.service")
-        print("Start with: systemctl start gpu-h100-temp-sensor.service")
-        print("Check status: systemctl status gpu-h100-temp-sensor.service")
+        print(f"Enable with: systemctl enable {service_name}.service")
+        print(f"Start with: systemctl start {service_name}.service")
+        print(f"Check status: systemctl status {service_name}.service")
         return True
         
     except IOError as e:
@@ -247,22 +563,24 @@ WantedBy=multi-user.target
         return False
 
 
-def create_sensors_config():
+def create_sensors_config(sensor_label="H100 NVL Avg Temp", temp_file="/tmp/gpu_h100_avg_temp",
+                          config_name="gpu-h100-temp"):
     """Create lm-sensors configuration"""
-    config_content = """# H100 NVL GPU Temperature Sensor Configuration
-# Custom H100 NVL GPU temperature monitoring
+    temp_file = Path(temp_file)
+    config_content = f"""# {sensor_label} Sensor Configuration
+# Custom GPU temperature monitoring
 
-chip "gpu_h100_avg_temp-*"
-    label temp1 "H100 NVL Avg Temp"
+chip "{temp_file.name}-*"
+    label temp1 "{sensor_label}"
     set temp1_max 90
     set temp1_crit 95
 
 # Alternative: Monitor via file-based sensor
-# You can also monitor /tmp/gpu_h100_avg_temp directly
+# You can also monitor {temp_file} directly
 """
     
     config_dir = Path("/etc/sensors.d")
-    config_file = config_dir / "gpu-h100-temp.conf"
+    config_file = config_dir / f"{config_name}.conf"
     
     try:
         config_dir.mkdir(exist_ok=True)
@@ -272,7 +590,7 @@ chip "gpu_h100_avg_temp-*"
         print(f"Sensors config created at {config_file}")
         print("Note: File-based monitoring is simpler than hwmon integration")
         print("You can monitor the temperature file directly:")
-        print("  watch -n 1 'echo \"H100 NVL Avg Temp: $(($(cat /tmp/gpu_h100_avg_temp) / 1000))°C\"'")
+        print(f"  watch -n 1 'echo \"{sensor_label}: $(($(cat {temp_file}) / 1000))°C\"'")
         return True
         
     except IOError as e:
@@ -290,33 +608,74 @@ Examples:
   %(prog)s --temp-file              # Write temp to file once  
   %(prog)s --daemon                 # Run as daemon
   %(prog)s --daemon --interval 10   # Run daemon with 10s interval
+  %(prog)s --daemon --cpu 3         # Run daemon pinned to CPU 3
+  %(prog)s --daemon --max-interval 60  # Poll less often while temperature is stable
+  %(prog)s --daemon --batch 12      # Also write 12 timestamped samples at a time
+  kill -HUP <daemon pid>            # Rescan GPUs after hot-add/removal
+  %(prog)s --all-gpus --daemon      # Report the hottest of all GPUs instead
   sudo %(prog)s --install-service   # Install as system service
 
-Temperature file location: /tmp/gpu_h100_avg_temp
+Temperature file location: /tmp/gpu_h100_avg_temp (--all-gpus: /tmp/gpu_max_temp)
 File format: temperature in millidegrees (multiply by 1000)
-Filters: Only monitors NVIDIA H100 NVL cards
+--batch N file: <temperature file>.batch, N lines of "<unix timestamp> <millidegrees>"
+Filters: Only monitors NVIDIA H100 NVL cards (--all-gpus: every GPU, maximum)
         """
     )
     
     parser.add_argument('--test', action='store_true',
-                       help='Test H100 NVL GPU temperature detection')
+                       help='Test GPU temperature detection')
     parser.add_argument('--temp-file', action='store_true',
                        help='Write temperature to file (one-time)')
     parser.add_argument('--daemon', action='store_true',
                        help='Run as daemon (continuous monitoring)')
     parser.add_argument('--interval', type=int, default=5,
                        help='Update interval in seconds for daemon mode (default: 5)')
+    parser.add_argument('--max-interval', type=int, default=None,
+                       help='Back off up to this many seconds while temperature is stable '
+                            '(polling mode only: NVML or --xml; default: fixed interval)')
+    parser.add_argument('--batch', type=int, default=1,
+                       help='Daemon mode: also buffer N timestamped samples and write them to '
+                            '<temperature file>.batch at once (default: 1)')
+    parser.add_argument('--cpu', type=int, default=0,
+                       help='CPU to pin the daemon to, keeping it off training cores on shared GPU nodes (default: 0)')
+    parser.add_argument('--all-gpus', action='store_true',
+                       help='Report the maximum temperature over all GPUs instead of the H100 NVL average')
+    parser.add_argument('--xml', action='store_true',
+                       help='Debug: also try the full nvidia-smi XML dump before CSV')
     parser.add_argument('--install-service', action='store_true',
                        help='Install systemd service (requires root)')
     
     args = parser.parse_args()
+    if args.batch < 1:
+        parser.error("--batch must be at least 1")
+    if args.cpu < 0:
+        parser.error("--cpu must not be negative")
+    if args.interval <= 0:
+        parser.error("--interval must be greater than 0")
+    if args.max_interval is not None and args.max_interval < args.interval:
+        parser.error("--max-interval must be at least --interval")
     
     # Check if running as root for service installation
     if args.install_service and os.geteuid() != 0:
         print("Error: Must run as root to install systemd service", file=sys.stderr)
         sys.exit(1)
     
-    sensor = GPUTempSensor()
+    # Batching only applies to the daemon; one-shot modes write a single value
+    batch = args.batch if args.daemon else 1
+    if args.all_gpus:
+        sensor = GPUTempSensor(target_product=None, agg=max_millidegrees,
+                               temp_file="/tmp/gpu_max_temp", label="Maximum",
+                               use_xml=args.xml, batch=batch)
+        description = "Maximum GPU Temperature Sensor"
+        service_name = "gpu-max-temp-sensor"
+        sensor_label = "GPU Max Temp"
+        config_name = "gpu-max-temp"
+    else:
+        sensor = GPUTempSensor(use_xml=args.xml, batch=batch)
+        description = "H100 NVL GPU Temperature Sensor"
+        service_name = "gpu-h100-temp-sensor"
+        sensor_label = "H100 NVL Avg Temp"
+        config_name = "gpu-h100-temp"
     
     if args.test:
         success = sensor.test_temperature()
@@ -328,21 +687,22 @@ Filters: Only monitors NVIDIA H100 NVL cards
     
     elif args.daemon:
         try:
-            sensor.run_daemon(args.interval)
+            sensor.run_daemon(args.interval, args.cpu, args.max_interval)
         except KeyboardInterrupt:
             print("\nDaemon stopped by user")
     
     elif args.install_service:
         script_path = Path(__file__).resolve()
-        service_ok = create_systemd_service(script_path, args.interval)
-        config_ok = create_sensors_config()
+        service_ok = create_systemd_service(script_path, args.interval, args.cpu, args.max_interval, args.batch,
+                                            args.all_gpus, description, service_name)
+        config_ok = create_sensors_config(sensor_label, sensor.temp_file, config_name)
         
         if service_ok and config_ok:
             print("\nInstallation complete!")
             print("Next steps:")
             print("1. systemctl daemon-reload")
-            print("2. systemctl enable gpu-h100-temp-sensor.service")
-            print("3. systemctl start gpu-h100-temp-sensor.service")
+            print(f"2. systemctl enable {service_name}.service")
+            print(f"3. systemctl start {service_name}.service")
         sys.exit(0 if (service_ok and config_ok) else 1)
     
     else: